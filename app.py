@@ -1,16 +1,29 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from square.client import Client
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, make_response, g, has_request_context, abort, send_from_directory
+from square_client import SquareClient
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 import os
 from dotenv import load_dotenv
 import matplotlib.pyplot as plt
 import io
 import base64
+import calendar
+import numpy as np
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as FlaskSQLAlchemySession
 import uuid
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from collections import OrderedDict, deque, Counter
+from functools import wraps
+import hashlib
+import json
+import mimetypes
+import threading
+import time
+import assets
 
 #were live :} 
 
@@ -46,10 +59,42 @@ def get_database_url():
     # Default to SQLite if configuration is incomplete
     return 'sqlite:///inventory.db'
 
+def get_replica_database_url():
+    """Read replica URL from the environment, or None to read from the primary.
+
+    To try it locally, start the app once without a replica so the tables,
+    cache version counters and row versions exist, then copy
+    instance/inventory.db to instance/replica.db and set
+    DB_REPLICA_URL=sqlite:///replica.db.
+    """
+    replica_url = os.getenv('DB_REPLICA_URL')
+    if replica_url and replica_url.startswith('postgres://'):
+        replica_url = replica_url.replace('postgres://', 'postgresql://', 1)
+    return replica_url or None
+
+def use_read_replica():
+    return has_request_context() and g.get('read_replica', False)
+
+class RoutingSession(FlaskSQLAlchemySession):
+    """Session that sends reads from replica-safe views to the read replica.
+
+    Flushes always go to the primary, as does everything outside a view
+    marked with @read_replica.
+    """
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and use_read_replica():
+            return self._db.engines['replica']
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
 # Configure database
 app.config['SQLALCHEMY_DATABASE_URI'] = get_database_url()
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db = SQLAlchemy(app)
+replica_url = get_replica_database_url()
+if replica_url:
+    app.config['SQLALCHEMY_BINDS'] = {'replica': replica_url}
+# Seconds after a write during which that browser session keeps reading from the primary
+app.config['REPLICA_READ_YOUR_WRITES_SECONDS'] = float(os.getenv('REPLICA_READ_YOUR_WRITES_SECONDS', '10'))
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
 
 # Define database models
 class InventoryItem(db.Model):
@@ -66,7 +111,7 @@ class SalesRecord(db.Model):
     item_id = db.Column(db.String(100), db.ForeignKey('inventory_item.id'))
     quantity = db.Column(db.Float)
     total_money = db.Column(db.Float)
-    date = db.Column(db.DateTime, default=datetime.utcnow)
+    date = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
 class SystemSettings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -82,6 +127,18 @@ class ItemSubcomponent(db.Model):
     item = db.relationship('InventoryItem', foreign_keys=[item_id], backref='subcomponents')
     subcomponent = db.relationship('InventoryItem', foreign_keys=[subcomponent_id])
 
+class CatalogVariation(db.Model):
+    # Square item variation -> inventory item. Sale line items reference
+    # variations, while inventory items are keyed by the parent ITEM id.
+    id = db.Column(db.String(100), primary_key=True)
+    item_id = db.Column(db.String(100), db.ForeignKey('inventory_item.id'), nullable=False, index=True)
+    name = db.Column(db.String(100))
+    # Units of the item's stock used up by selling one of this variation
+    unit_multiplier = db.Column(db.Float, nullable=False, default=1.0)
+
+    # Lets the unit of work insert a new item before the variations pointing at it
+    item = db.relationship('InventoryItem')
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -93,21 +150,75 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+class FinanceAccount(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    balance = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class ScheduledPayment(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    due_date = db.Column(db.Date, nullable=False)
+    # 'once', 'weekly' or 'monthly'; recurring payments repeat from due_date
+    recurrence = db.Column(db.String(10), nullable=False, default='once')
+
+    def occurrences(self, start, end):
+        """Dates in [start, end) on which this payment falls due"""
+        if self.recurrence == 'weekly':
+            due = self.due_date
+            if due < start:
+                due += timedelta(days=-(-(start - due).days // 7) * 7)
+            while due < end:
+                yield due
+                due += timedelta(days=7)
+        elif self.recurrence == 'monthly':
+            months = max(0, (start.year - self.due_date.year) * 12 + start.month - self.due_date.month)
+            while True:
+                year, month = divmod(self.due_date.month - 1 + months, 12)
+                year += self.due_date.year
+                month += 1
+                due = date(year, month, min(self.due_date.day, calendar.monthrange(year, month)[1]))
+                if due >= end:
+                    break
+                if due >= start:
+                    yield due
+                months += 1
+        elif start <= self.due_date < end:
+            yield self.due_date
+
+class CacheVersion(db.Model):
+    # One row per counter; bumped in the same transaction as the write so
+    # every gunicorn worker sees the new version as soon as it commits.
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class RowVersion(db.Model):
+    # Change log for the sync API: the inventory version at which each row
+    # last changed. Deleted rows stay behind as tombstones.
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(30), nullable=False)
+    entity_id = db.Column(db.String(100), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('entity', 'entity_id'),
+        db.Index('ix_row_version_entity_version', 'entity', 'version', 'entity_id'),
+    )
+
 # Initialize the Square client
-client = Client(
+# SQUARE_CUSTOM_URL points the client at another server, e.g. square_stub.py.
+# The request budget is per process, so divide Square's limit by the worker count.
+client = SquareClient(
     access_token=os.getenv("SQUARE_ACCESS_TOKEN"),
-    environment=os.getenv("SQUARE_ENVIRONMENT", "production")
+    environment=os.getenv("SQUARE_ENVIRONMENT", "production"),
+    custom_url=os.getenv("SQUARE_CUSTOM_URL"),
+    requests_per_second=float(os.getenv("SQUARE_REQUESTS_PER_SECOND", "10")),
+    max_retries=int(os.getenv("SQUARE_MAX_RETRIES", "5"))
 )
 
 # Global variables
-account_balance = 5000.00  # Example starting balance
-
-scheduled_payments = [
-    {'name': 'Rent', 'amount': 2000.00, 'due_date': '2023-11-01'},
-    {'name': 'Utilities', 'amount': 500.00, 'due_date': '2023-10-25'},
-    {'name': 'Debt Payment', 'amount': 750.00, 'due_date': '2023-10-30'},
-]
-
 last_assessed = '2024-03-01T00:00:00Z'  # Default starting date
 
 # Add at the top with other globals
@@ -122,8 +233,412 @@ login_manager.login_view = 'login'
 def load_user(user_id):
     return User.query.get(int(user_id))
 
+# Set ASSET_CDN_FALLBACK=1 to run without built bundles (e.g. a checkout missing
+# vendor files); pages then load the vendored files, or the public CDN for any that are missing
+ASSET_CDN_FALLBACK = os.getenv('ASSET_CDN_FALLBACK') == '1'
+
+# Build (or reuse) the fingerprinted bundles once at startup; with preload_app
+# this runs in the gunicorn master before the workers fork. Nothing is downloaded here.
+try:
+    ASSET_MANIFEST = assets.ensure_built()
+except OSError as e:
+    if not ASSET_CDN_FALLBACK:
+        raise RuntimeError(f"Could not build static assets: {e}") from e
+    ASSET_MANIFEST = {}
+
+@app.template_global()
+def asset_urls(bundle):
+    """URLs to load for `bundle`: the fingerprinted build, or its sources when falling back"""
+    if bundle in ASSET_MANIFEST:
+        return [url_for('dist_asset', filename=ASSET_MANIFEST[bundle])]
+    if not ASSET_CDN_FALLBACK:
+        raise RuntimeError(f"Asset bundle {bundle} was not built")
+
+    urls = []
+    for source in assets.BUNDLES[bundle]:
+        if source in assets.VENDOR_FILES and not os.path.exists(os.path.join(assets.STATIC_DIR, source)):
+            urls.append(assets.VENDOR_FILES[source])
+        else:
+            urls.append(url_for('static', filename=source))
+    return urls
+
+@app.route('/assets/<path:filename>')
+def dist_asset(filename):
+    # File names carry a content hash, so they can be cached forever
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(assets.DIST_DIR, filename + suffix)):
+            response = send_from_directory(assets.DIST_DIR, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(assets.DIST_DIR, filename, mimetype=mimetype)
+
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+# Response cache for the inventory pages
+INVENTORY_CACHE_SIZE = int(os.getenv('INVENTORY_CACHE_SIZE', '256'))
+# Seconds a worker may reuse a cache version counter without re-reading it, so
+# repeated views skip the database. A worker sees its own commits at once; a
+# write made by another worker can take up to this long to show. 0 = always check.
+# (login_required still loads the user per request, so removed accounts lose access immediately.)
+CACHE_VERSION_TTL = float(os.getenv('CACHE_VERSION_TTL', '2'))
+INVENTORY_MODELS = (InventoryItem, ItemSubcomponent, SalesRecord)
+# Writes to these invalidate the cash-flow projection
+FINANCE_MODELS = (SalesRecord, FinanceAccount, ScheduledPayment)
+CACHE_VERSION_NAMES = ('inventory', 'finance')
+
+# Resources exposed by the sync API, with the columns sent for each row
+SYNC_ENTITIES = {
+    InventoryItem: 'items',
+    ItemSubcomponent: 'subcomponents',
+    SalesRecord: 'sales',
+}
+SYNC_FIELDS = {
+    'items': ['id', 'name', 'stock', 'reorder_threshold', 'reorder_quantity', 'supplier', 'is_mix'],
+    'subcomponents': ['id', 'item_id', 'subcomponent_id', 'quantity_required'],
+    'sales': ['id', 'item_id', 'quantity', 'total_money', 'date'],
+}
+SYNC_PAGE_SIZE = 500
+SYNC_MAX_PAGE_SIZE = 1000
+
+# New on every start (once per deploy: with preload_app the gunicorn master sets it
+# before forking), so browsers don't revalidate pre-deploy pages to a 304
+RESPONSE_BUILD_ID = uuid.uuid4().hex
+
+_response_cache = OrderedDict()
+_response_cache_lock = threading.Lock()
+# Last version seen per (database, counter); the replica can lag behind the primary
+_cache_versions = {}
+
+def ensure_cache_versions():
+    """Create the version counter rows if this is a fresh database"""
+    for name in CACHE_VERSION_NAMES:
+        if not CacheVersion.query.get(name):
+            db.session.add(CacheVersion(name=name, version=0))
+    db.session.commit()
+
+def ensure_indexes():
+    """Create indexes added to models after their tables already existed"""
+    for index in SalesRecord.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+
+def backfill_row_versions():
+    """Stamp rows written before the change log existed with a fresh version"""
+    version = next_cache_version(db.session.connection(), 'inventory')
+    row_versions = RowVersion.__table__
+
+    inserted = 0
+    for model, entity in SYNC_ENTITIES.items():
+        entity_id = db.cast(model.id, db.String)
+        known = db.select(row_versions.c.entity_id).where(row_versions.c.entity == entity)
+        missing = db.select(
+            db.literal(entity), entity_id, db.literal(version), db.literal(False)
+        ).where(entity_id.not_in(known))
+        result = db.session.execute(
+            row_versions.insert().from_select(['entity', 'entity_id', 'version', 'deleted'], missing)
+        )
+        inserted += result.rowcount
+
+    if inserted:
+        db.session.commit()
+    else:
+        db.session.rollback()
+
+def next_cache_version(connection, name):
+    """Bump counter `name` on `connection` and return the new value"""
+    version_table = CacheVersion.__table__
+    connection.execute(
+        version_table.update()
+        .where(version_table.c.name == name)
+        .values(version=version_table.c.version + 1)
+    )
+    return connection.execute(
+        db.select(version_table.c.version).where(version_table.c.name == name)
+    ).scalar()
+
+def stamp_row_versions(connection, version, changes):
+    """Upsert change-log rows for `changes`, a list of (entity, entity_id, deleted)"""
+    row_versions = RowVersion.__table__
+
+    known = set()
+    for entity in {change[0] for change in changes}:
+        ids = [change[1] for change in changes if change[0] == entity]
+        known.update(connection.execute(
+            db.select(row_versions.c.entity, row_versions.c.entity_id)
+            .where(row_versions.c.entity == entity, row_versions.c.entity_id.in_(ids))
+        ).all())
+
+    updates = [{'b_entity': entity, 'b_entity_id': entity_id, 'b_deleted': deleted}
+               for entity, entity_id, deleted in changes if (entity, entity_id) in known]
+    inserts = [{'entity': entity, 'entity_id': entity_id, 'version': version, 'deleted': deleted}
+               for entity, entity_id, deleted in changes if (entity, entity_id) not in known]
+
+    if updates:
+        connection.execute(
+            row_versions.update()
+            .where(row_versions.c.entity == db.bindparam('b_entity'),
+                   row_versions.c.entity_id == db.bindparam('b_entity_id'))
+            .values(version=version, deleted=db.bindparam('b_deleted')),
+            updates
+        )
+    if inserts:
+        connection.execute(row_versions.insert(), inserts)
+
+@event.listens_for(db.session, 'after_flush')
+def bump_inventory_version(session, flush_context):
+    changes = {}
+    for obj in session.new:
+        if isinstance(obj, INVENTORY_MODELS):
+            changes[(SYNC_ENTITIES[type(obj)], str(obj.id))] = False
+    for obj in session.dirty:
+        if isinstance(obj, INVENTORY_MODELS) and session.is_modified(obj):
+            changes[(SYNC_ENTITIES[type(obj)], str(obj.id))] = False
+    for obj in session.deleted:
+        if isinstance(obj, INVENTORY_MODELS):
+            changes[(SYNC_ENTITIES[type(obj)], str(obj.id))] = True
+    if not changes:
+        return
+
+    # Run on the flush's own connection so the bump commits or rolls back with the write
+    connection = session.connection()
+    version = next_cache_version(connection, 'inventory')
+    stamp_row_versions(connection, version,
+                       [(entity, entity_id, deleted) for (entity, entity_id), deleted in changes.items()])
+    session.info['versions_changed'] = True
+
+@event.listens_for(db.session, 'after_flush')
+def bump_finance_version(session, flush_context):
+    changed = any(isinstance(obj, FINANCE_MODELS) for obj in session.new | session.deleted) or \
+        any(isinstance(obj, FINANCE_MODELS) and session.is_modified(obj) for obj in session.dirty)
+    if changed:
+        next_cache_version(session.connection(), 'finance')
+        session.info['versions_changed'] = True
+
+@event.listens_for(db.session, 'after_flush')
+def note_write(session, flush_context):
+    session.info['wrote'] = True
+
+@event.listens_for(db.session, 'after_commit')
+def expire_cache_versions(db_session):
+    if db_session.info.pop('versions_changed', False):
+        _cache_versions.clear()
+
+    # Keep this browser session on the primary until the replica has caught up
+    if db_session.info.pop('wrote', False) and has_request_context():
+        session['last_write_at'] = time.time()
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_cache_versions(session):
+    session.info.pop('versions_changed', None)
+    session.info.pop('wrote', None)
+
+def get_cache_version(name='inventory'):
+    now = time.monotonic()
+    key = ('replica' if use_read_replica() else 'primary', name)
+    cached = _cache_versions.get(key)
+    if cached and now - cached[1] < CACHE_VERSION_TTL:
+        return cached[0]
+
+    version = db.session.query(CacheVersion.version).filter_by(name=name).scalar() or 0
+    _cache_versions[key] = (version, now)
+    return version
+
+def read_replica(view):
+    """Let a read-only view query the replica, unless this browser session wrote recently"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        since_write = time.time() - session.get('last_write_at', 0)
+        if 'replica' in app.config.get('SQLALCHEMY_BINDS', {}) and \
+                since_write > app.config['REPLICA_READ_YOUR_WRITES_SECONDS']:
+            g.read_replica = True
+        return view(*args, **kwargs)
+
+    return wrapper
+
+# SQL profiler: off unless SQL_PROFILER is 'request' (profile requests that
+# pass ?profile_sql=1 or an X-Profile-SQL: 1 header) or 'all'
+SQL_PROFILER = os.getenv('SQL_PROFILER', 'off')
+SQL_SLOW_MS = float(os.getenv('SQL_SLOW_MS', '100'))
+# Identical statements run this many times in one request are reported as N+1
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', '5'))
+# Optional file that every report is appended to as one JSON line
+SQL_PROFILE_LOG = os.getenv('SQL_PROFILE_LOG')
+
+sql_profile_reports = deque(maxlen=int(os.getenv('SQL_PROFILE_KEEP', '50')))
+_sql_profile_log_lock = threading.Lock()
+
+def sql_profiling_requested():
+    if SQL_PROFILER == 'all':
+        return True
+    if SQL_PROFILER == 'request':
+        return request.args.get('profile_sql') == '1' or request.headers.get('X-Profile-SQL') == '1'
+    return False
+
+@app.before_request
+def start_sql_profile():
+    if request.endpoint != 'static' and sql_profiling_requested():
+        g.sql_profile = {'started': time.perf_counter(), 'statements': []}
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def time_statement(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the per-execution context, not the pooled connection, so a
+    # statement that raises leaves nothing behind
+    if context is not None and has_request_context() and 'sql_profile' in g:
+        context.sql_profile_start = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def record_statement(conn, cursor, statement, parameters, context, executemany):
+    if not (has_request_context() and 'sql_profile' in g):
+        return
+    started = getattr(context, 'sql_profile_start', None)
+    if started is None:
+        return
+
+    duration_ms = (time.perf_counter() - started) * 1000
+    record = {'statement': statement, 'duration_ms': round(duration_ms, 3)}
+    if duration_ms >= SQL_SLOW_MS:
+        record['parameters'] = repr(parameters)[:500]
+        if not executemany and statement.lstrip().upper().startswith('SELECT'):
+            record['plan'] = explain_statement(conn, cursor, statement, parameters)
+    g.sql_profile['statements'].append(record)
+
+def explain_statement(conn, cursor, statement, parameters):
+    """Run EXPLAIN for a slow statement on the same DBAPI connection.
+
+    Goes through a raw cursor so the EXPLAIN is not itself profiled. On
+    PostgreSQL a failed EXPLAIN would abort the request's transaction, so it
+    runs inside a savepoint there.
+    """
+    is_sqlite = conn.dialect.name == 'sqlite'
+    prefix = 'EXPLAIN QUERY PLAN ' if is_sqlite else 'EXPLAIN '
+    explain_cursor = cursor.connection.cursor()
+    try:
+        if not is_sqlite:
+            explain_cursor.execute('SAVEPOINT sql_profile_explain')
+        try:
+            explain_cursor.execute(prefix + statement, parameters)
+            plan = [' '.join(str(column) for column in row) for row in explain_cursor.fetchall()]
+        except Exception as e:
+            if not is_sqlite:
+                explain_cursor.execute('ROLLBACK TO SAVEPOINT sql_profile_explain')
+            plan = [f'EXPLAIN failed: {e}']
+        if not is_sqlite:
+            explain_cursor.execute('RELEASE SAVEPOINT sql_profile_explain')
+    finally:
+        explain_cursor.close()
+    return plan
+
+def build_sql_report(profile, response):
+    statements = profile['statements']
+
+    repeated = {}
+    for record in statements:
+        entry = repeated.setdefault(record['statement'], {'count': 0, 'total_ms': 0.0})
+        entry['count'] += 1
+        entry['total_ms'] += record['duration_ms']
+
+    return {
+        'id': uuid.uuid4().hex[:12],
+        'at': datetime.utcnow().isoformat(timespec='seconds'),
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'status': response.status_code,
+        'request_ms': round((time.perf_counter() - profile['started']) * 1000, 3),
+        'query_count': len(statements),
+        'query_ms': round(sum(record['duration_ms'] for record in statements), 3),
+        'n_plus_one': sorted(
+            ({'statement': statement, 'count': entry['count'], 'total_ms': round(entry['total_ms'], 3)}
+             for statement, entry in repeated.items() if entry['count'] >= SQL_N_PLUS_ONE_THRESHOLD),
+            key=lambda entry: entry['count'], reverse=True
+        ),
+        'slow': [record for record in statements if record['duration_ms'] >= SQL_SLOW_MS],
+    }
+
+@app.after_request
+def finish_sql_profile(response):
+    profile = g.pop('sql_profile', None)
+    if profile is None:
+        return response
+
+    report = build_sql_report(profile, response)
+    sql_profile_reports.append(report)
+
+    for entry in report['n_plus_one']:
+        app.logger.warning('N+1 on %s: %d x %s', report['path'], entry['count'], entry['statement'])
+    for record in report['slow']:
+        app.logger.warning('Slow query on %s (%.1f ms): %s\n%s', report['path'], record['duration_ms'],
+                           record['statement'], '\n'.join(record.get('plan', [])))
+
+    if SQL_PROFILE_LOG:
+        with _sql_profile_log_lock:
+            with open(SQL_PROFILE_LOG, 'a') as log_file:
+                log_file.write(json.dumps(report) + '\n')
+
+    response.headers['X-SQL-Profile'] = f"{report['id']}; queries={report['query_count']}; ms={report['query_ms']}"
+    return response
+
+def cached_inventory_view(view):
+    """Serve a rendered page from memory until the next inventory write.
+
+    Entries are keyed by route, user and the search/sort/page arguments and
+    are only valid for the inventory version they were rendered at. Clients
+    get an ETag for the same key and build, so a revalidation between writes
+    is a 304.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # Flash messages are rendered into the page, so those responses are
+        # built fresh and never stored
+        if session.get('_flashes'):
+            return view(*args, **kwargs)
+
+        key = (
+            request.endpoint,
+            current_user.get_id(),
+            request.args.get('search'),
+            request.args.get('sort'),
+            request.args.get('direction'),
+            request.args.get('page'),
+        )
+        version = get_cache_version()
+        etag = hashlib.sha1(repr((RESPONSE_BUILD_ID, version, key)).encode()).hexdigest()
+
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            with _response_cache_lock:
+                entry = _response_cache.get(key)
+                if entry and entry[0] == version:
+                    _response_cache.move_to_end(key)
+                    body = entry[1]
+                else:
+                    body = None
+
+            if body is None:
+                body = view(*args, **kwargs)
+                if not isinstance(body, str):
+                    return body
+                with _response_cache_lock:
+                    _response_cache[key] = (version, body)
+                    _response_cache.move_to_end(key)
+                    while len(_response_cache) > INVENTORY_CACHE_SIZE:
+                        _response_cache.popitem(last=False)
+
+            response = make_response(body)
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    return wrapper
+
 @app.route('/')
+@read_replica
 @login_required
+@cached_inventory_view
 def index():
     search_query = request.args.get('search', '')
     sort = request.args.get('sort', 'name')
@@ -152,7 +667,9 @@ def index():
     return render_template('index.html', low_stock_items=low_stock_items, search_query=search_query)
 
 @app.route('/inventory')
+@read_replica
 @login_required
+@cached_inventory_view
 def inventory():
     search_query = request.args.get('search', '')
     sort = request.args.get('sort', 'name')  # Default sort by name
@@ -181,10 +698,78 @@ def inventory():
     return render_template('inventory.html', items=items, search_query=search_query)
 
 @app.route('/finances')
+@login_required
 def finances_page():
-    return render_template('finances.html')
+    try:
+        days = int(request.args.get('days', 30))
+    except ValueError:
+        days = 30
+    days = max(1, min(days, PROJECTION_MAX_DAYS))
+
+    projection = project_cash_flow(days)
+    payments = ScheduledPayment.query.order_by(ScheduledPayment.due_date).all()
+    return render_template('finances.html', projection=projection, payments=payments, days=days)
+
+@app.route('/finances/balance', methods=['POST'])
+@login_required
+def update_balance():
+    try:
+        account = get_finance_account()
+        account.balance = float(request.form.get('balance', ''))
+        account.updated_at = datetime.utcnow()
+        db.session.commit()
+        flash('Balance updated successfully', 'success')
+    except ValueError:
+        db.session.rollback()
+        flash('Validation error: Balance must be a valid number', 'error')
+
+    return redirect(url_for('finances_page'))
+
+@app.route('/finances/payments', methods=['POST'])
+@login_required
+def add_scheduled_payment():
+    try:
+        name = request.form.get('name', '').strip()
+        recurrence = request.form.get('recurrence', 'once')
+        if not name:
+            raise ValueError("Payment name cannot be empty")
+        try:
+            amount = float(request.form.get('amount', ''))
+        except ValueError:
+            raise ValueError("Amount must be a valid number")
+        if amount <= 0:
+            raise ValueError("Amount must be positive")
+        try:
+            due_date = datetime.strptime(request.form.get('due_date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError("Due date must be a valid date")
+        if recurrence not in ('once', 'weekly', 'monthly'):
+            raise ValueError("Unknown recurrence")
+
+        db.session.add(ScheduledPayment(name=name, amount=amount, due_date=due_date, recurrence=recurrence))
+        db.session.commit()
+        flash(f'Payment "{name}" scheduled', 'success')
+    except ValueError as e:
+        db.session.rollback()
+        flash(f'Validation error: {str(e)}', 'error')
+
+    return redirect(url_for('finances_page'))
+
+@app.route('/finances/payments/<int:payment_id>/delete', methods=['POST'])
+@login_required
+def delete_scheduled_payment(payment_id):
+    payment = ScheduledPayment.query.get(payment_id)
+    if payment:
+        db.session.delete(payment)
+        db.session.commit()
+        flash(f'Removed payment "{payment.name}"', 'success')
+    else:
+        flash('Payment not found', 'error')
+
+    return redirect(url_for('finances_page'))
 
 @app.route('/item/<item_id>')
+@read_replica
 def item_details(item_id):
     item = InventoryItem.query.get_or_404(item_id)
     # Add this query to get subcomponents
@@ -205,10 +790,13 @@ def item_details(item_id):
         'current_stock': sub[0].stock,
         'quantity_required': sub[1]
     } for sub in subcomponents]
+
+    variations = CatalogVariation.query.filter_by(item_id=item_id).order_by(CatalogVariation.name).all()
     
     return render_template('item_details.html', 
                          item=item, 
-                         subcomponents=subcomponents_data)
+                         subcomponents=subcomponents_data,
+                         variations=variations)
 
 @app.route('/add_item', methods=['GET', 'POST'])
 def add_item():
@@ -296,6 +884,7 @@ def delete_item(item_id):
         item = InventoryItem.query.get(item_id)
         if item:
             item_name = item.name  # Store name before deletion for flash message
+            CatalogVariation.query.filter_by(item_id=item_id).delete()
             db.session.delete(item)
             db.session.commit()
             flash(f'Successfully deleted {item_name}', 'success')
@@ -379,24 +968,21 @@ def update_item(item_id):
 # Add your functions here...
 
 def get_location_id(store_name=None, debug=DEBUG):
-    locations_api = client.locations
-    result = locations_api.list_locations()
-    
-    if result.is_success():
-        locations = result.body.get('locations', [])
-        if locations:
-            if store_name:
-                # Try to find location by name
-                for loc in locations:
-                    if loc.get('name', '').lower() == store_name.lower():
-                        return loc.get('id')
-                if debug: print(f"No location found with name: {store_name}")
-                return None
-            else:
-                # If no store name provided, return first location ID
-                return locations[0].get('id')
-    else:
-        if debug: print(f"Error fetching locations: {result.errors}")
+    # Errors raise SquareAPIError once retries are exhausted
+    result = client.request('locations', 'list_locations')
+
+    locations = result.body.get('locations', [])
+    if locations:
+        if store_name:
+            # Try to find location by name
+            for loc in locations:
+                if loc.get('name', '').lower() == store_name.lower():
+                    return loc.get('id')
+            if debug: print(f"No location found with name: {store_name}")
+            return None
+        else:
+            # If no store name provided, return first location ID
+            return locations[0].get('id')
     return None
 
 def fetch_itemized_sales(start_date=None, end_date=None, store_name=None, debug=DEBUG):
@@ -409,7 +995,6 @@ def fetch_itemized_sales(start_date=None, end_date=None, store_name=None, debug=
     if not location_id:
         raise ValueError("Could not fetch location ID")
         
-    orders_api = client.orders
     body = {
         "location_ids": [location_id],
         "query": {
@@ -431,16 +1016,13 @@ def fetch_itemized_sales(start_date=None, end_date=None, store_name=None, debug=
         if cursor:
             body['cursor'] = cursor
 
-        result = orders_api.search_orders(body)
+        # A page that still fails after retries raises instead of ending the sync early
+        result = client.request('orders', 'search_orders', body)
 
-        if result.is_success():
-            result_orders = result.body.get('orders', [])
-            orders.extend(result_orders)
-            cursor = result.body.get('cursor', None)
-            if not cursor:
-                break
-        else:
-            if debug: print(f"Error fetching orders: {result.errors}")
+        result_orders = result.body.get('orders', [])
+        orders.extend(result_orders)
+        cursor = result.body.get('cursor', None)
+        if not cursor:
             break
 
     # Process orders to extract itemized sales data
@@ -459,30 +1041,20 @@ def fetch_itemized_sales(start_date=None, end_date=None, store_name=None, debug=
     return sales_data
 
 def fetch_all_catalog_items(debug=DEBUG):
-    catalog_api = client.catalog
     all_items = []
     cursor = None
 
-    try:
-        while True:
-            result = catalog_api.list_catalog(
-                cursor=cursor,
-                types='ITEM'
-            )
-
-            if result.is_success():
-                items = result.body.get('objects', [])
-                all_items.extend(items)
+    while True:
+        # A page that still fails after retries raises instead of returning a partial catalog
+        result = client.request('catalog', 'list_catalog', cursor=cursor, types='ITEM')
 
-                cursor = result.body.get('cursor')
-                if not cursor:
-                    break
-            elif result.is_error():
-                if debug: print(f"Error fetching catalog: {result.errors}")
-                break
+        items = result.body.get('objects', [])
+        all_items.extend(items)
+        if debug: print(f"Fetched {len(items)} catalog items")
 
-    except Exception as e:
-        if debug: print(f"An unexpected error occurred: {e}")
+        cursor = result.body.get('cursor')
+        if not cursor:
+            break
 
     return all_items
 
@@ -490,14 +1062,18 @@ def update_inventory_from_catalog(debug=DEBUG):
     catalog_items = fetch_all_catalog_items(debug)
     new_items_count = 0
 
+    # Load what we already have in two queries instead of one lookup per catalog object
+    existing_ids = {item_id for (item_id,) in db.session.query(InventoryItem.id)}
+    variations = {variation.id: variation for variation in CatalogVariation.query}
+    new_items = {}
+
     for item in catalog_items:
         item_id = item.get('id')
-        item_name = item.get('item_data', {}).get('name')
-        
-        # Check if item exists in database
-        inv_item = InventoryItem.query.get(item_id)
-        if not inv_item:
-            inv_item = InventoryItem(
+        item_data = item.get('item_data', {})
+        item_name = item_data.get('name')
+
+        if item_id not in existing_ids:
+            new_items[item_id] = InventoryItem(
                 id=item_id,
                 name=item_name,
                 stock=0,
@@ -505,13 +1081,46 @@ def update_inventory_from_catalog(debug=DEBUG):
                 reorder_quantity=20,
                 supplier='Unknown'
             )
-            db.session.add(inv_item)
+            db.session.add(new_items[item_id])
+            existing_ids.add(item_id)
             new_items_count += 1
             if debug: print(f"Added new item to inventory: {item_name} (ID: {item_id})")
-    
+
+        # Map each variation to its item; multipliers set by hand are kept
+        for variation in item_data.get('variations', []):
+            variation_id = variation.get('id')
+            variation_name = variation.get('item_variation_data', {}).get('name')
+            mapping = variations.get(variation_id)
+            if mapping is None:
+                mapping = CatalogVariation(id=variation_id, name=variation_name, unit_multiplier=1.0)
+                db.session.add(mapping)
+            elif mapping.item_id == item_id and mapping.name == variation_name:
+                continue
+            mapping.name = variation_name
+            # Link new items through the relationship so their INSERT is flushed first
+            if item_id in new_items:
+                mapping.item = new_items[item_id]
+            else:
+                mapping.item_id = item_id
+
     db.session.commit()
     return new_items_count
 
+def load_sale_index():
+    """Map every catalog object id a sale can carry to (item_id, unit_multiplier).
+
+    Variations come from the catalog sync; item ids map to themselves so
+    sales that reference the ITEM directly still resolve.
+    """
+    sale_index = {item_id: (item_id, 1.0) for (item_id,) in db.session.query(InventoryItem.id)}
+    sale_index.update(
+        (variation_id, (item_id, unit_multiplier))
+        for variation_id, item_id, unit_multiplier in db.session.query(
+            CatalogVariation.id, CatalogVariation.item_id, CatalogVariation.unit_multiplier
+        )
+    )
+    return sale_index
+
 def update_inventory_from_sales():
     # Get the last assessed time from database
     settings = SystemSettings.query.first()
@@ -526,40 +1135,70 @@ def update_inventory_from_sales():
         end_date=current_time.strftime('%Y-%m-%d')
     )
 
+    # Resolve every sale line with one dict lookup
+    sale_index = load_sale_index()
+    resolved_sales = []
+    unmatched = Counter()
     for sale in sales_data:
-        item_id = sale['item_id']
-        item = InventoryItem.query.get(item_id)
-        if item:
-            # Update main item stock
-            item.stock -= sale['quantity']
-            if item.stock < 0:
-                item.stock = 0
-            
-            # Update subcomponents stock
-            subcomponents = ItemSubcomponent.query.filter_by(item_id=item_id).all()
-            for subcomponent in subcomponents:
-                sub_item = InventoryItem.query.get(subcomponent.subcomponent_id)
-                if sub_item:
-                    # Calculate how many subcomponents were used
-                    sub_quantity_used = sale['quantity'] * subcomponent.quantity_required
-                    sub_item.stock -= sub_quantity_used
-                    if sub_item.stock < 0:
-                        sub_item.stock = 0
-                        flash(f'Warning: {sub_item.name} stock went negative', 'warning')
-            
-            # Record the sale
-            sale_record = SalesRecord(
-                item_id=item_id,
-                quantity=sale['quantity'],
-                total_money=sale['total_money'],
-                date=datetime.strptime(sale['date'], '%Y-%m-%dT%H:%M:%SZ')
-            )
-            db.session.add(sale_record)
-    
+        resolved = sale_index.get(sale['item_id'])
+        if resolved is None:
+            unmatched[sale['item_id']] += 1
+        else:
+            resolved_sales.append((sale, *resolved))
+
+    # Load the sold items, their subcomponents and the subcomponent items up front
+    sold_ids = {item_id for _, item_id, _ in resolved_sales}
+    subcomponents_by_item = {}
+    if sold_ids:
+        for subcomponent in ItemSubcomponent.query.filter(ItemSubcomponent.item_id.in_(sold_ids)):
+            subcomponents_by_item.setdefault(subcomponent.item_id, []).append(subcomponent)
+    needed_ids = sold_ids | {sub.subcomponent_id for subs in subcomponents_by_item.values() for sub in subs}
+    items = {item.id: item for item in InventoryItem.query.filter(InventoryItem.id.in_(needed_ids))} if needed_ids else {}
+
+    for sale, item_id, unit_multiplier in resolved_sales:
+        item = items.get(item_id)
+        if not item:
+            continue
+        quantity = sale['quantity'] * unit_multiplier
+
+        # Update main item stock
+        item.stock -= quantity
+        if item.stock < 0:
+            item.stock = 0
+
+        # Update subcomponents stock
+        for subcomponent in subcomponents_by_item.get(item_id, []):
+            sub_item = items.get(subcomponent.subcomponent_id)
+            if sub_item:
+                # Calculate how many subcomponents were used
+                sub_quantity_used = quantity * subcomponent.quantity_required
+                sub_item.stock -= sub_quantity_used
+                if sub_item.stock < 0:
+                    sub_item.stock = 0
+                    flash(f'Warning: {sub_item.name} stock went negative', 'warning')
+
+        # Record the sale in stock units of the resolved item
+        sale_record = SalesRecord(
+            item_id=item_id,
+            quantity=quantity,
+            total_money=sale['total_money'],
+            date=datetime.strptime(sale['date'], '%Y-%m-%dT%H:%M:%SZ')
+        )
+        db.session.add(sale_record)
+
     # Update the last assessed time
     settings.last_assessed = current_time
     db.session.commit()
 
+    if unmatched:
+        app.logger.warning('%d sale lines matched no catalog item; most common ids: %s',
+                           sum(unmatched.values()), unmatched.most_common(10))
+    return {
+        'recorded': len(resolved_sales),
+        'unmatched': sum(unmatched.values()),
+        'unmatched_ids': dict(unmatched),
+    }
+
 def generate_sales_plot(sales_data):
     df = pd.DataFrame(sales_data)
     df['date'] = pd.to_datetime(df['date']).dt.date
@@ -582,13 +1221,101 @@ def generate_sales_plot(sales_data):
     img_base64 = base64.b64encode(buf.getvalue()).decode('ascii')
     return img_base64
 
+# Cash-flow projection
+# Weekday averages over this many days of sales drive the income forecast
+FORECAST_LOOKBACK_DAYS = int(os.getenv('FORECAST_LOOKBACK_DAYS', '56'))
+PROJECTION_MAX_DAYS = 365
+
+_projection_cache = {}
+_projection_cache_lock = threading.Lock()
+
+def get_finance_account():
+    account = FinanceAccount.query.first()
+    if not account:
+        account = FinanceAccount(balance=0.0)
+        db.session.add(account)
+        db.session.commit()
+    return account
+
+def forecast_daily_income(start, days):
+    """Expected sales income for each of the `days` days from `start`.
+
+    Each day gets the average takings for its weekday over the last
+    FORECAST_LOOKBACK_DAYS days, with days without sales counted as zero.
+    """
+    lookback_start = start - timedelta(days=FORECAST_LOOKBACK_DAYS)
+    sale_day = db.func.date(SalesRecord.date)
+    daily_totals = db.session.query(sale_day, db.func.sum(SalesRecord.total_money)).filter(
+        SalesRecord.date >= datetime.combine(lookback_start, datetime.min.time()),
+        SalesRecord.date < datetime.combine(start, datetime.min.time())
+    ).group_by(sale_day).all()
+
+    history = pd.Series(
+        [total or 0.0 for _, total in daily_totals],
+        index=pd.to_datetime([day for day, _ in daily_totals]),
+        dtype=float
+    ).reindex(pd.date_range(lookback_start, periods=FORECAST_LOOKBACK_DAYS), fill_value=0.0)
+
+    weekday_means = history.groupby(history.index.dayofweek).mean()
+    future = pd.date_range(start, periods=days)
+    return weekday_means.reindex(future.dayofweek, fill_value=0.0).to_numpy()
+
+def project_cash_flow(days):
+    """Running balance for each of the next `days` days.
+
+    Results are cached per worker until a sale, payment or balance change
+    bumps the finance version.
+    """
+    account = get_finance_account()
+    start = date.today()
+    key = (start, days)
+    version = get_cache_version('finance')
+
+    with _projection_cache_lock:
+        cached = _projection_cache.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    end = start + timedelta(days=days)
+    outflow = np.zeros(days)
+    for payment in ScheduledPayment.query.all():
+        for due in payment.occurrences(start, end):
+            outflow[(due - start).days] += payment.amount
+
+    income = forecast_daily_income(start, days)
+    balance = account.balance + np.cumsum(income - outflow)
+    lowest = int(np.argmin(balance))
+
+    dates = [start + timedelta(days=offset) for offset in range(days)]
+    projection = {
+        'starting_balance': account.balance,
+        'updated_at': account.updated_at,
+        'ending_balance': float(balance[-1]),
+        'lowest_balance': float(balance[lowest]),
+        'lowest_date': dates[lowest],
+        'days': [
+            {'date': day, 'income': float(day_income), 'payments': float(day_outflow), 'balance': float(day_balance)}
+            for day, day_income, day_outflow, day_balance in zip(dates, income, outflow, balance)
+        ],
+    }
+
+    with _projection_cache_lock:
+        # Projections from earlier days can never be served again
+        for stale in [k for k in _projection_cache if k[0] != start]:
+            del _projection_cache[stale]
+        _projection_cache[key] = (version, projection)
+    return projection
+
 # Add new route for manual inventory update
 @app.route('/update_inventory', methods=['POST'])
 def update_inventory():
     try:
         update_inventory_from_catalog()
-        update_inventory_from_sales()
+        result = update_inventory_from_sales()
         flash('Inventory updated successfully!', 'success')
+        if result['unmatched']:
+            flash(f"{result['unmatched']} sale lines did not match any catalog item "
+                  f"({len(result['unmatched_ids'])} distinct IDs)", 'warning')
     except Exception as e:
         flash(f'Error updating inventory: {str(e)}', 'error')
     return redirect(url_for('index'))
@@ -596,8 +1323,12 @@ def update_inventory():
 # Initialize database
 with app.app_context():
     db.create_all()
+    ensure_indexes()
+    ensure_cache_versions()
+    backfill_row_versions()
 
 @app.route('/search_items')
+@read_replica
 def search_items():
     q = request.args.get('q', '')
     
@@ -618,6 +1349,93 @@ def search_items():
         'stock': item.stock
     } for item in items])
 
+@app.route('/api/v1/<resource>')
+@read_replica
+@login_required
+def sync_changes(resource):
+    """Rows of `resource` changed after version `since`, oldest change first.
+
+    A client starts with since=0, follows `cursor` while `has_more` is set,
+    then keeps the returned `version` for its next sync. Rows come back as
+    arrays in `fields` order; deleted rows are listed by id in `deleted`.
+    """
+    model = next((m for m, entity in SYNC_ENTITIES.items() if entity == resource), None)
+    if model is None:
+        return jsonify({'error': f'Unknown resource: {resource}'}), 404
+
+    try:
+        since = int(request.args.get('since', 0))
+        limit = min(int(request.args.get('limit', SYNC_PAGE_SIZE)), SYNC_MAX_PAGE_SIZE)
+        cursor = request.args.get('cursor')
+        if cursor:
+            cursor_version, cursor_id = cursor.split(':', 1)
+            cursor_version = int(cursor_version)
+    except ValueError:
+        return jsonify({'error': 'since and limit must be integers and cursor must come from a previous page'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+
+    # Read the counter before the rows so a write committing in between is
+    # picked up by the next sync rather than skipped
+    current_version = get_cache_version()
+    etag = hashlib.sha1(repr((resource, since, cursor, limit, current_version)).encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    changes = RowVersion.query.filter(
+        RowVersion.entity == resource,
+        RowVersion.version > since
+    )
+    if cursor:
+        changes = changes.filter(db.or_(
+            RowVersion.version > cursor_version,
+            db.and_(RowVersion.version == cursor_version, RowVersion.entity_id > cursor_id)
+        ))
+    changes = changes.order_by(RowVersion.version, RowVersion.entity_id).limit(limit + 1).all()
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    live_ids = [change.entity_id for change in changes if not change.deleted]
+    if model is SalesRecord:
+        live_ids = [int(entity_id) for entity_id in live_ids]
+    rows = {str(row.id): row for row in model.query.filter(model.id.in_(live_ids))} if live_ids else {}
+
+    fields = SYNC_FIELDS[resource]
+    upserts = []
+    deleted = []
+    for change in changes:
+        row = rows.get(change.entity_id)
+        if row is None:
+            deleted.append(change.entity_id)
+            continue
+        values = [getattr(row, field) for field in fields]
+        upserts.append([value.isoformat() if isinstance(value, datetime) else value for value in values])
+
+    if has_more:
+        last = changes[-1]
+        version = last.version
+        next_cursor = f'{last.version}:{last.entity_id}'
+    else:
+        version = max([current_version, since] + [change.version for change in changes])
+        next_cursor = None
+
+    response = jsonify({
+        'resource': resource,
+        'since': since,
+        'version': version,
+        'fields': fields,
+        'upserts': upserts,
+        'deleted': deleted,
+        'cursor': next_cursor,
+        'has_more': has_more,
+    })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @app.route('/item/<item_id>/add_subcomponent', methods=['POST'])
 def add_subcomponent(item_id):
     try:
@@ -677,6 +1495,38 @@ def remove_subcomponent(item_id, subcomponent_id):
         
     return redirect(url_for('item_details', item_id=item_id))
 
+@app.route('/item/<item_id>/variation/<variation_id>', methods=['POST'])
+def update_variation(item_id, variation_id):
+    try:
+        variation = CatalogVariation.query.filter_by(id=variation_id, item_id=item_id).first()
+        if not variation:
+            flash('Variation not found', 'error')
+            return redirect(url_for('item_details', item_id=item_id))
+
+        try:
+            unit_multiplier = float(request.form.get('unit_multiplier', ''))
+        except ValueError:
+            raise ValueError("Unit multiplier must be a valid number")
+        if unit_multiplier <= 0:
+            raise ValueError("Unit multiplier must be positive")
+
+        variation.unit_multiplier = unit_multiplier
+        db.session.commit()
+        flash('Variation updated successfully', 'success')
+
+    except ValueError as e:
+        db.session.rollback()
+        flash(f'Validation error: {str(e)}', 'error')
+
+    return redirect(url_for('item_details', item_id=item_id))
+
+@app.route('/admin/square_stats')
+@login_required
+def square_stats():
+    if current_user.username != 'admin':
+        abort(403)
+    return jsonify(client.stats.snapshot())
+
 # Add this debugging route to check what's in the database
 @app.route('/debug/subcomponents/<item_id>')
 def debug_subcomponents(item_id):
@@ -708,6 +1558,16 @@ def debug_subcomponents(item_id):
             'error': str(e)
         })
 
+@app.route('/admin/sql_profile')
+@login_required
+def sql_profile():
+    if current_user.username != 'admin':
+        abort(403)
+    return render_template('sql_profile.html',
+                           reports=list(reversed(sql_profile_reports)),
+                           profiler_mode=SQL_PROFILER,
+                           slow_ms=SQL_SLOW_MS)
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
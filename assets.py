@@ -0,0 +1,154 @@
+"""Build fingerprinted, precompressed static bundles
+
+The app calls ensure_built() at startup, so a deploy builds its own
+bundles from local files only; `python assets.py` forces a rebuild. The
+pinned vendor libraries are committed under static/vendor/; when one is
+missing the build fails and names it, and `python assets.py --fetch`
+downloads it from VENDOR_FILES so it can be committed.
+Each bundle is concatenated, minified and written to
+static/dist/<name>.<hash>.<ext> with .gz (and .br when the brotli package is
+installed) next to it, and the file names are recorded in
+static/dist/manifest.json.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import urllib.request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+STATIC_DIR = os.path.join(basedir, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+# Vendored libraries, relative to static/, and the pinned release they come from
+VENDOR_FILES = {
+    'vendor/bootstrap.min.css': 'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css',
+    'vendor/bootstrap.bundle.min.js': 'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js',
+    'vendor/jquery.min.js': 'https://code.jquery.com/jquery-3.6.0.min.js',
+    'vendor/select2.min.css': 'https://cdn.jsdelivr.net/npm/select2@4.1.0-rc.0/dist/css/select2.min.css',
+    'vendor/select2.min.js': 'https://cdn.jsdelivr.net/npm/select2@4.1.0-rc.0/dist/js/select2.min.js',
+}
+
+# Bundle name -> source files relative to static/, in load order
+BUNDLES = {
+    'vendor.css': ['vendor/bootstrap.min.css', 'vendor/select2.min.css'],
+    'vendor.js': ['vendor/jquery.min.js', 'vendor/select2.min.js', 'vendor/bootstrap.bundle.min.js'],
+    'app.css': ['style.css'],
+}
+
+def missing_vendor_files():
+    return [path for path in VENDOR_FILES if not os.path.exists(os.path.join(STATIC_DIR, path))]
+
+def fetch_vendor_files():
+    """Download any vendored library that is not in static/vendor/ yet"""
+    for path in missing_vendor_files():
+        url = VENDOR_FILES[path]
+        target = os.path.join(STATIC_DIR, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        print(f"Downloading {url}")
+        with urllib.request.urlopen(url, timeout=30) as response:
+            data = response.read()
+        with open(target, 'wb') as f:
+            f.write(data)
+
+def minify_css(css):
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r'([{;])\s*([\w-]+)\s*:\s*', r'\1\2:', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+def build_bundle(name, sources):
+    parts = []
+    for source in sources:
+        with open(os.path.join(STATIC_DIR, source), encoding='utf-8') as f:
+            content = f.read()
+        if source.endswith('.css') and '.min.' not in source:
+            content = minify_css(content)
+        parts.append(content)
+
+    separator = '\n' if name.endswith('.css') else ';\n'
+    return separator.join(parts).encode('utf-8')
+
+def write_asset(name, data):
+    """Write `data` under a content-hashed file name and return that name"""
+    stem, ext = os.path.splitext(name)
+    filename = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+    path = os.path.join(DIST_DIR, filename)
+
+    with open(path, 'wb') as f:
+        f.write(data)
+    # mtime=0 keeps the .gz byte-identical across builds
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+
+    return filename
+
+def build():
+    missing = missing_vendor_files()
+    if missing:
+        raise FileNotFoundError(f"Missing vendor files in static/: {', '.join(missing)}. "
+                                f"Run `python assets.py --fetch` and commit them.")
+    os.makedirs(DIST_DIR, exist_ok=True)
+
+    manifest = {}
+    for name, sources in BUNDLES.items():
+        manifest[name] = write_asset(name, build_bundle(name, sources))
+        print(f"{name} -> {manifest[name]}")
+
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    if brotli is None:
+        print("brotli is not installed; only .gz files were written")
+    return manifest
+
+def load_manifest():
+    """Bundle name -> fingerprinted file name, or {} if assets were never built"""
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def is_stale(manifest):
+    """True if a bundle is missing or older than any of its sources"""
+    if set(manifest) != set(BUNDLES):
+        return True
+
+    for name, sources in BUNDLES.items():
+        built = os.path.join(DIST_DIR, manifest[name])
+        if not os.path.exists(built):
+            return True
+        for source in sources:
+            source_path = os.path.join(STATIC_DIR, source)
+            if not os.path.exists(source_path) or os.path.getmtime(source_path) > os.path.getmtime(built):
+                return True
+    return False
+
+def ensure_built():
+    """Return the manifest, building the bundles first if they are missing or stale"""
+    manifest = load_manifest()
+    if manifest and not is_stale(manifest):
+        return manifest
+    return build()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fetch', action='store_true', help='download missing vendor files before building')
+    args = parser.parse_args()
+
+    if args.fetch:
+        fetch_vendor_files()
+    build()
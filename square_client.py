@@ -0,0 +1,170 @@
+"""Shared Square API client
+
+Wraps the Square SDK so every call goes through one pooled HTTP session,
+a request budget shared by all threads, and retries with exponential
+backoff for rate limits (429), server errors (5xx) and dropped connections.
+Anything still failing after the last retry raises SquareAPIError instead of
+looking like the end of the data.
+
+Only use it for idempotent calls; the searches and listings we make are.
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from square.client import Client
+
+
+class SquareAPIError(Exception):
+    def __init__(self, endpoint, status_code=None, errors=None):
+        self.endpoint = endpoint
+        self.status_code = status_code
+        self.errors = errors
+        super().__init__(f"Square {endpoint} failed ({status_code or 'no response'}): {errors}")
+
+
+class RequestBudget:
+    """Token bucket limiting requests per second across threads.
+
+    A rate-limit response pauses the whole bucket, so every thread backs
+    off instead of only the one that was told to.
+    """
+
+    def __init__(self, requests_per_second, burst=None):
+        self.rate = requests_per_second
+        self.capacity = burst or max(1.0, requests_per_second)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class EndpointStats:
+    """Per-endpoint call counts and latency"""
+
+    def __init__(self):
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, elapsed_ms=None, outcome='ok'):
+        with self.lock:
+            entry = self.stats.setdefault(endpoint, {
+                'calls': 0, 'ok': 0, 'retried': 0, 'failed': 0, 'total_ms': 0.0, 'max_ms': 0.0
+            })
+            entry[outcome] += 1
+            if elapsed_ms is not None:
+                entry['calls'] += 1
+                entry['total_ms'] += elapsed_ms
+                entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                endpoint: dict(entry, avg_ms=round(entry['total_ms'] / entry['calls'], 3) if entry['calls'] else None)
+                for endpoint, entry in self.stats.items()
+            }
+
+
+def retry_after_seconds(headers):
+    """Seconds to wait from a Retry-After header (delta or HTTP date), if any"""
+    value = (headers or {}).get('Retry-After') or (headers or {}).get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class SquareClient:
+    def __init__(self, access_token, environment='production', custom_url=None,
+                 requests_per_second=10.0, max_retries=5, backoff_base=0.5, backoff_max=30.0,
+                 pool_size=10, timeout=60):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.budget = RequestBudget(requests_per_second)
+        self.stats = EndpointStats()
+
+        # One keep-alive pool for every call; retries are ours, not urllib3's
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        options = {
+            'access_token': access_token,
+            'environment': environment,
+            'http_client_instance': self.session,
+            'timeout': timeout,
+            'max_retries': 0,
+        }
+        if custom_url:
+            options['environment'] = 'custom'
+            options['custom_url'] = custom_url
+        self.sdk = Client(**options)
+
+    def request(self, api_name, method_name, *args, **kwargs):
+        """Call `self.sdk.<api_name>.<method_name>(*args, **kwargs)` with retries.
+
+        Returns the successful ApiResponse, or raises SquareAPIError.
+        """
+        endpoint = f'{api_name}.{method_name}'
+        method = getattr(getattr(self.sdk, api_name), method_name)
+
+        for attempt in range(self.max_retries + 1):
+            self.budget.acquire()
+            started = time.perf_counter()
+            status_code = errors = wait = None
+            try:
+                result = method(*args, **kwargs)
+            except requests.RequestException as e:
+                errors = str(e)
+                elapsed_ms = None
+            else:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                if result.is_success():
+                    self.stats.record(endpoint, elapsed_ms)
+                    return result
+
+                status_code, errors = result.status_code, result.errors
+                if status_code != 429 and status_code < 500:
+                    self.stats.record(endpoint, elapsed_ms, 'failed')
+                    raise SquareAPIError(endpoint, status_code, errors)
+                wait = retry_after_seconds(result.headers)
+
+            # Retries run inside the web request, so a long Retry-After would outlive the worker timeout
+            if attempt == self.max_retries or (wait is not None and wait > self.backoff_max):
+                self.stats.record(endpoint, elapsed_ms, 'failed')
+                raise SquareAPIError(endpoint, status_code, errors)
+            self.stats.record(endpoint, elapsed_ms, 'retried')
+
+            if wait is None:
+                # Full jitter keeps threads that failed together from retrying together
+                wait = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            if status_code == 429:
+                self.budget.pause(wait)
+            time.sleep(wait)
@@ -0,0 +1,142 @@
+"""Local Square API stub that injects faults
+
+Serves the three endpoints the sync uses (locations, order search and
+catalog listing) from generated data, and fails a share of requests with
+429s, 500/503s or dropped connections. Point the app at it to check that a
+sync survives the faults and still gets every page:
+
+    python square_stub.py --fail-rate 0.3
+    SQUARE_CUSTOM_URL=http://127.0.0.1:8765 python -c \
+        "import app; print(len(app.fetch_all_catalog_items()))"
+
+The stub prints how many requests it served and how many it failed.
+"""
+import argparse
+import json
+import random
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubState:
+    def __init__(self, items, orders, page_size, fail_rate, seed):
+        self.items = [{
+            'type': 'ITEM',
+            'id': f'ITEM{i}',
+            'item_data': {
+                'name': f'Stub item {i}',
+                'variations': [{
+                    'type': 'ITEM_VARIATION',
+                    'id': f'VAR{i}',
+                    'item_variation_data': {'item_id': f'ITEM{i}', 'name': 'Regular'},
+                }],
+            },
+        } for i in range(items)]
+        self.orders = [{
+            'id': f'ORDER{i}',
+            'created_at': '2024-03-01T12:00:00Z',
+            'line_items': [{
+                'catalog_object_id': f'VAR{i % max(items, 1)}',
+                'name': f'Stub item {i % max(items, 1)}',
+                'quantity': '1',
+                'total_money': {'amount': 500, 'currency': 'USD'},
+            }],
+        } for i in range(orders)]
+        self.page_size = page_size
+        self.fail_rate = fail_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {'served': 0, '429': 0, '500': 0, '503': 0, 'dropped': 0}
+
+    def pick_fault(self):
+        with self.lock:
+            if self.random.random() >= self.fail_rate:
+                self.counts['served'] += 1
+                return None
+            fault = self.random.choice(['429', '500', '503', 'dropped'])
+            self.counts[fault] += 1
+            return fault
+
+    def page(self, rows, cursor):
+        start = int(cursor or 0)
+        end = start + self.page_size
+        return rows[start:end], (str(end) if end < len(rows) else None)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.handle_request()
+
+    def do_POST(self):
+        self.handle_request()
+
+    def handle_request(self):
+        state = self.server.state
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+        fault = state.pick_fault()
+        if fault == 'dropped':
+            self.connection.shutdown(socket.SHUT_RDWR)
+            self.close_connection = True
+            return
+        if fault == '429':
+            return self.send_json(429, {'errors': [{'category': 'RATE_LIMIT_ERROR', 'code': 'RATE_LIMITED'}]},
+                                  {'Retry-After': '1'})
+        if fault:
+            return self.send_json(int(fault), {'errors': [{'category': 'API_ERROR', 'code': 'INTERNAL_SERVER_ERROR'}]})
+
+        url = urlparse(self.path)
+        if url.path == '/v2/locations':
+            return self.send_json(200, {'locations': [{'id': 'LOC1', 'name': 'Stub Store'}]})
+        if url.path == '/v2/orders/search':
+            orders, cursor = state.page(state.orders, body.get('cursor'))
+            return self.send_json(200, {'orders': orders, **({'cursor': cursor} if cursor else {})})
+        if url.path == '/v2/catalog/list':
+            cursor = parse_qs(url.query).get('cursor', [None])[0]
+            objects, cursor = state.page(state.items, cursor)
+            return self.send_json(200, {'objects': objects, **({'cursor': cursor} if cursor else {})})
+        self.send_json(404, {'errors': [{'category': 'INVALID_REQUEST_ERROR', 'code': 'NOT_FOUND'}]})
+
+    def send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def make_server(port=8765, items=250, orders=400, page_size=100, fail_rate=0.3, seed=None):
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.state = StubState(items, orders, page_size, fail_rate, seed)
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--items', type=int, default=250)
+    parser.add_argument('--orders', type=int, default=400)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--fail-rate', type=float, default=0.3)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.items, args.orders, args.page_size, args.fail_rate, args.seed)
+    print(f"Square stub on http://127.0.0.1:{args.port} (fail rate {args.fail_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(server.state.counts)